@@ -3,19 +3,72 @@
 AI Red Team Project
 """
 
+from __future__ import annotations
+
 import os
 import json
 import asyncio
 import argparse
+import codecs
+import functools
+import logging
+import logging.handlers
+import queue
 import re
-from typing import Dict, List, Optional, Any
+import stat
+import sys
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Any
 
 from dotenv import load_dotenv
-from azure.identity import DefaultAzureCredential
-from azure.ai.evaluation.red_team import RedTeam, RiskCategory, AttackStrategy
 
-# Import target classes from targets folder
-from targets.mcs_agent_callback import McsAgentCallbackTarget, McsAgentConfig
+# orjson is optional; fall back to the standard library parser when absent
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# Azure SDKs and target classes are imported lazily inside the functions that
+# use them so that --help and configuration errors don't pay their import cost
+if TYPE_CHECKING:
+    from azure.ai.evaluation.red_team import RedTeam, RiskCategory, AttackStrategy
+    from targets.mcs_agent_callback import McsAgentConfig
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Logging
+# ---------------------------------------------------------------------------
+
+def configure_logging(level: int = logging.INFO) -> Callable[[], None]:
+    """Route log records through a queue so console I/O runs on a background thread.
+    
+    All of the tool's status output goes through this one handler (on stderr), so
+    it stays in order with SDK warnings.
+    
+    Returns a function that flushes pending records and restores direct logging.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(logging.Formatter("%(message)s"))
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    root_logger = logging.getLogger()
+    root_logger.addHandler(queue_handler)
+    
+    # Only this tool's loggers are raised to `level`; SDK loggers keep their defaults
+    logger.setLevel(level)
+    logging.getLogger("targets").setLevel(level)
+    
+    listener = logging.handlers.QueueListener(log_queue, console_handler)
+    listener.start()
+    
+    def stop_logging() -> None:
+        # Detach the queue first so later records (e.g. during event loop
+        # teardown) fall back to the default handler instead of being dropped
+        root_logger.removeHandler(queue_handler)
+        listener.stop()
+    
+    return stop_logging
 
 
 # ---------------------------------------------------------------------------
@@ -25,98 +78,189 @@ from targets.mcs_agent_callback import McsAgentCallbackTarget, McsAgentConfig
 def load_environment_variables():
     """Load environment variables from .env file."""
     load_dotenv()
-    print("Environment variables loaded from .env file")
+    logger.info("Environment variables loaded from .env file")
+
+
+# Matches ${VAR} and ${VAR:-default}; any other ${...} is captured in group 3 and rejected
+_ENV_VAR_PATTERN = re.compile(r'\$\{(?:([A-Za-z_][A-Za-z0-9_]*)(?::-([^}]*))?|([^}]*))\}')
 
 
 def substitute_env_vars(text: str) -> str:
-    """Replace ${VAR_NAME} placeholders with environment variable values."""
+    """Replace ${VAR_NAME} and ${VAR_NAME:-default} placeholders with environment variable values."""
+    if '${' not in text:
+        return text
+    
     def replace_func(match):
-        var_name = match.group(1)
-        value = os.getenv(var_name)
+        var_name, default, invalid = match.group(1, 2, 3)
+        if invalid is not None:
+            raise ValueError(f"Invalid environment variable placeholder: {match.group(0)}")
+        value = os.environ.get(var_name)
+        if default is not None:
+            # As in the shell, the default applies when the variable is unset or empty
+            return value or default
         if value is None:
             raise ValueError(f"Environment variable '{var_name}' not found")
         return value
     
-    return re.sub(r'\$\{([^}]+)\}', replace_func, text)
+    return _ENV_VAR_PATTERN.sub(replace_func, text)
+
+
+class ConfigError(ValueError):
+    """Raised when the configuration file has a missing or invalid setting."""
+
+
+# Maximum number of probes in flight when red_team.concurrency is not set
+DEFAULT_CONCURRENCY = 8
+
+# Settings that must be present (and non-empty) before any SDK is touched
+REQUIRED_KEYS = (
+    (("target", "type"), "Target type not specified in config file"),
+    (("azure_ai_project", "project_endpoint"), "Azure AI Project endpoint is required"),
+)
+
+# Fields of the "mcs_agent" section, all required for the MCS Agent callback target
+MCS_AGENT_KEYS = ("tenant_id", "app_client_id", "environment_id", "agent_identifier")
+
+# Additional settings required by each supported target type
+TARGET_REQUIRED_KEYS = {
+    "mcs_agent_callback": tuple(
+        (("mcs_agent", key), f"MCS Agent setting 'mcs_agent.{key}' is required for MCS Agent callback target")
+        for key in MCS_AGENT_KEYS
+    ),
+}
+
+
+def _check_required(config_data: Dict[str, Any], required_keys) -> None:
+    for path, message in required_keys:
+        value: Any = config_data
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if not value:
+            raise ConfigError(message)
+
+
+def validate_config(config_data: Dict[str, Any]) -> None:
+    """Check required settings without importing SDKs or creating credentials."""
+    _check_required(config_data, REQUIRED_KEYS)
+    
+    target_type = config_data["target"]["type"]
+    if not isinstance(target_type, str) or target_type not in TARGET_REQUIRED_KEYS:
+        supported = ", ".join(f"'{name}'" for name in TARGET_REQUIRED_KEYS)
+        raise ConfigError(f"Unsupported target type: {target_type}. Supported types: {supported}.")
+    _check_required(config_data, TARGET_REQUIRED_KEYS[target_type])
+    
+    for section in ("red_team", "scan"):
+        if not isinstance(config_data.get(section, {}), dict):
+            raise ConfigError(f"'{section}' must be an object in config file")
+    
+    red_team_config = config_data.get("red_team", {})
+    concurrency = red_team_config.get("concurrency", DEFAULT_CONCURRENCY)
+    if isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency < 1:
+        raise ConfigError(f"red_team.concurrency must be an integer >= 1, got {concurrency!r}")
 
 
 def load_config(config_path: str) -> Dict[str, Any]:
     """Load configuration from JSON file and substitute environment variables."""
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"Configuration file not found: {config_path}")
-    
     # Load raw JSON content
-    with open(config_path, 'r') as f:
-        raw_content = f.read()
+    try:
+        with open(config_path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Configuration file not found: {config_path}") from None
+    
+    # Drop a UTF-8 byte order mark (common in files saved on Windows); orjson
+    # rejects it, so strip it here to behave the same with either parser
+    if content.startswith(codecs.BOM_UTF8):
+        content = content[len(codecs.BOM_UTF8):]
     
-    # Substitute environment variables
-    processed_content = substitute_env_vars(raw_content)
+    # Substitute environment variables, rebinding the same name so the
+    # unsubstituted copy can be released before parsing
+    if b'${' in content:
+        content = substitute_env_vars(content.decode('utf-8'))
     
     # Parse JSON
-    return json.loads(processed_content)
+    return json_loads(content)
 
 
-def create_mcs_agent_config(config_data: Dict[str, Any]) -> Optional[McsAgentConfig]:
-    """Create MCS Agent configuration if available."""
-    mcs_config = config_data.get("mcs_agent", {})
-    if not all([mcs_config.get("tenant_id"), mcs_config.get("app_client_id"),
-                mcs_config.get("environment_id"), mcs_config.get("agent_identifier")]):
-        return None
+def create_mcs_agent_config(config_data: Dict[str, Any]) -> McsAgentConfig:
+    """Create MCS Agent configuration from a config already checked by validate_config."""
+    from targets.mcs_agent_callback import McsAgentConfig
     
-    return McsAgentConfig(
-        tenant_id=mcs_config["tenant_id"],
-        app_client_id=mcs_config["app_client_id"],
-        environment_id=mcs_config["environment_id"],
-        agent_identifier=mcs_config["agent_identifier"]
-    )
+    mcs_config = config_data["mcs_agent"]
+    return McsAgentConfig(**{key: mcs_config[key] for key in MCS_AGENT_KEYS})
 
 
 # ---------------------------------------------------------------------------
 # Create Target Based on Configuration
 # ---------------------------------------------------------------------------
 
-def create_target(target_type: str, mcs_agent_config: Optional[McsAgentConfig]):
-    """Create target instance based on type."""
-    if target_type == "mcs_agent_callback":
-        if not mcs_agent_config:
-            raise ValueError("MCS Agent config is required for MCS Agent callback target")
-        target = McsAgentCallbackTarget(mcs_agent_config)
-        return target.get_target()
-    else:
-        raise ValueError(f"Unsupported target type: {target_type}. Only 'mcs_agent_callback' is supported.")
+def create_target(mcs_agent_config: McsAgentConfig, concurrency: int = DEFAULT_CONCURRENCY):
+    """Create the MCS Agent callback target (the only type accepted by validate_config)."""
+    from targets.mcs_agent_callback import McsAgentCallbackTarget
+    
+    target = McsAgentCallbackTarget(mcs_agent_config, concurrency)
+    return target.get_target()
 
 
 # ---------------------------------------------------------------------------
 # Parse Risk Categories and Attack Strategies
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=None)
+def _enum_lookup(enum_cls: type) -> Dict[str, Any]:
+    """Build a name -> member table for an enum, once per enum class."""
+    return dict(enum_cls.__members__)
+
+
 def parse_risk_categories(category_strings: List[str]) -> List[RiskCategory]:
     """Convert category strings to RiskCategory enums."""
-    risk_categories = []
-    for category_str in category_strings:
-        risk_categories.append(getattr(RiskCategory, category_str))
-    return risk_categories
+    from azure.ai.evaluation.red_team import RiskCategory
+    
+    lookup = _enum_lookup(RiskCategory)
+    try:
+        return [lookup[category_str] for category_str in category_strings]
+    except KeyError as e:
+        raise ConfigError(f"Unknown risk category: {e.args[0]}") from None
+
+
+_DIFFICULTY_GROUPS = frozenset(("EASY", "MODERATE", "DIFFICULT"))
 
 
 def parse_attack_strategies(strategy_strings: List[str]) -> List[AttackStrategy]:
     """Convert strategy strings to AttackStrategy enums."""
-    attack_strategies = []
-    for strategy_str in strategy_strings:
-        if strategy_str.upper() == "EASY":
-            attack_strategies.append(AttackStrategy.EASY)
-        elif strategy_str.upper() == "MODERATE":
-            attack_strategies.append(AttackStrategy.MODERATE)
-        elif strategy_str.upper() == "DIFFICULT":
-            attack_strategies.append(AttackStrategy.DIFFICULT)
-        else:
-            attack_strategies.append(getattr(AttackStrategy, strategy_str))
-    return attack_strategies
+    from azure.ai.evaluation.red_team import AttackStrategy
+    
+    lookup = _enum_lookup(AttackStrategy)
+    try:
+        # Only the difficulty groups are matched case-insensitively
+        return [
+            lookup[strategy_str.upper()] if strategy_str.upper() in _DIFFICULTY_GROUPS else lookup[strategy_str]
+            for strategy_str in strategy_strings
+        ]
+    except KeyError as e:
+        raise ConfigError(f"Unknown attack strategy: {e.args[0]}") from None
 
 
 # ---------------------------------------------------------------------------
 # Red Team Scan
 # ---------------------------------------------------------------------------
 
+def _is_file(path: str) -> bool:
+    """Return True if path is a regular file, using a single stat call."""
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def get_credential():
+    """Return the process-wide Azure credential, created on first use."""
+    from azure.identity import DefaultAzureCredential
+    
+    return DefaultAzureCredential()
+
+
 def create_red_team(
     project_endpoint: str, 
     risk_categories: List[RiskCategory], 
@@ -124,11 +268,13 @@ def create_red_team(
     custom_prompts_path: Optional[str] = None
 ) -> RedTeam:
     """Create RedTeam instance with optional custom prompts."""
-    credential = DefaultAzureCredential()
+    from azure.ai.evaluation.red_team import RedTeam
     
-    # If custom prompts path is provided and file exists, use custom prompts
-    if custom_prompts_path and os.path.exists(custom_prompts_path):
-        print(f"Using custom prompts from: {custom_prompts_path}")
+    credential = get_credential()
+    
+    # If custom prompts path is provided and is an existing file, use custom prompts
+    if custom_prompts_path and _is_file(custom_prompts_path):
+        logger.info("Using custom prompts from: %s", custom_prompts_path)
         return RedTeam(
             azure_ai_project=project_endpoint,
             credential=credential,
@@ -136,7 +282,7 @@ def create_red_team(
         )
     
     # Otherwise use standard risk categories
-    print(f"Using standard risk categories with {num_objectives} objectives")
+    logger.info("Using standard risk categories with %d objectives", num_objectives)
     return RedTeam(
         azure_ai_project=project_endpoint,
         credential=credential,
@@ -144,19 +290,26 @@ def create_red_team(
         num_objectives=num_objectives,
     )
 
-async def run_red_team_scan(target, scan_name: str, attack_strategies: List[AttackStrategy], red_team: RedTeam):
-    """Run the red team scan."""
-    print(f"Starting red team scan: {scan_name}")
+async def run_red_team_scan(
+    target,
+    scan_name: str,
+    attack_strategies: List[AttackStrategy],
+    red_team: RedTeam,
+    concurrency: int = DEFAULT_CONCURRENCY
+):
+    """Run the red team scan with up to `concurrency` probes in flight."""
+    logger.info("Starting red team scan: %s", scan_name)
     
     # Run the scan (reports will be auto-generated)
     result = await red_team.scan(
         target=target,
         scan_name=scan_name,
-        attack_strategies=attack_strategies
+        attack_strategies=attack_strategies,
+        max_parallel_tasks=concurrency
     )
     
-    print(f"Red team scan completed: {scan_name}")
-    print(f"Scan results are automatically saved in the scan directory.")
+    logger.info("Red team scan completed: %s", scan_name)
+    logger.info("Scan results are automatically saved in the scan directory.")
     
     return result
 
@@ -183,10 +336,11 @@ Example:
     )
     
     args = parser.parse_args()
+    stop_logging = configure_logging()
     
-    print("AI Red Team Evaluation Tool")
-    print("=" * 40)
-    print(f"Using configuration file: {args.config}")
+    logger.info("AI Red Team Evaluation Tool")
+    logger.info("=" * 40)
+    logger.info("Using configuration file: %s", args.config)
     
     try:
         # Step 1: Load environment variables from .env file
@@ -195,40 +349,32 @@ Example:
         # Step 2: Load configuration from JSON file (with env var substitution)
         config_data = load_config(args.config)
         
-        # Step 3: Get target type from config file
-        target_type = config_data.get("target", {}).get("type")
-        if not target_type:
-            print("Error: Target type not specified in config file")
-            return
-        
-        print(f"Target type from config: {target_type}")
+        # Step 3: Validate required settings before any SDK is loaded
+        validate_config(config_data)
         
         # Step 4: Extract configuration sections
-        azure_ai_project = config_data.get("azure_ai_project", {})
-        project_endpoint = azure_ai_project.get("project_endpoint")
+        target_type = config_data["target"]["type"]
+        logger.info("Target type from config: %s", target_type)
         
+        project_endpoint = config_data["azure_ai_project"]["project_endpoint"]
         red_team_config = config_data.get("red_team", {})
         scan_config = config_data.get("scan", {})
         
-        # Step 5: Validate required settings
-        if not project_endpoint:
-            print("Error: Azure AI Project endpoint is required")
-            return
-        
-        print("Configuration loaded successfully")
-        print(f"Project endpoint: {project_endpoint}")
+        logger.info("Configuration loaded successfully")
+        logger.info("Project endpoint: %s", project_endpoint)
         
-        # Step 6: Parse risk categories and attack strategies
+        # Step 5: Parse risk categories and attack strategies
         risk_categories = parse_risk_categories(red_team_config.get("risk_categories", ["Violence", "HateUnfairness"]))
         attack_strategies = parse_attack_strategies(red_team_config.get("attack_strategies", ["Flip"]))
         num_objectives = red_team_config.get("num_objectives", 1)
+        concurrency = red_team_config.get("concurrency", DEFAULT_CONCURRENCY)
         custom_prompts_path = red_team_config.get("custom_prompts_path", "")
         scan_name = scan_config.get("name", "RedTeamScan")
         
-        # Step 7: Create MCS Agent config
+        # Step 6: Create MCS Agent config
         mcs_agent_config = create_mcs_agent_config(config_data)
         
-        # Step 8: Create RedTeam instance (with optional custom prompts)
+        # Step 7: Create RedTeam instance (with optional custom prompts)
         red_team = create_red_team(
             project_endpoint, 
             risk_categories, 
@@ -236,23 +382,25 @@ Example:
             custom_prompts_path if custom_prompts_path else None
         )
         
-        # Step 9: Create target
-        target = create_target(target_type, mcs_agent_config)
+        # Step 8: Create target
+        target = create_target(mcs_agent_config, concurrency)
         
-        # Step 10: Run the red team scan
-        result = await run_red_team_scan(target, scan_name, attack_strategies, red_team)
+        # Step 9: Run the red team scan
+        result = await run_red_team_scan(target, scan_name, attack_strategies, red_team, concurrency)
         
-        print("\n" + "=" * 40)
-        print("Red team evaluation completed successfully!")
+        logger.info("\n%s", "=" * 40)
+        logger.info("Red team evaluation completed successfully!")
         
         return result
         
+    except ConfigError as e:
+        logger.error("Error: %s", e)
     except KeyboardInterrupt:
-        print("\nOperation cancelled by user")
+        logger.info("\nOperation cancelled by user")
     except Exception as e:
-        print(f"Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error: %s", e)
+    finally:
+        stop_logging()
 
 
 if __name__ == "__main__":
@@ -6,7 +6,10 @@ Will be updated with the latest changes from the Copilot Studio client implement
 from os import environ
 from pathlib import Path
 from typing import Optional
+import base64
+import json
 import logging
+import time
 
 from msal import PublicClientApplication
 from msal_extensions import build_encrypted_persistence, FilePersistence, PersistedTokenCache
@@ -105,6 +108,20 @@ class McsConnectionSettings(ConnectionSettings):
         raise Exception("Authentication with the Public AgentApplication failed")
 
 
+# Assumed token lifetime when the access token's expiry cannot be read
+DEFAULT_TOKEN_LIFETIME_SECONDS = 3600
+
+
+def get_token_expiry(token: str) -> float:
+    """Return the expiry time (epoch seconds) from a JWT access token's exp claim."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + DEFAULT_TOKEN_LIFETIME_SECONDS
+
+
 class McsCopilotClient(McsConnectionSettings, CopilotClient):
     def __init__(self, connection_settings: McsConnectionSettings = None, copilot_client: CopilotClient = None) -> None:
         if connection_settings:
@@ -116,8 +133,14 @@ class McsCopilotClient(McsConnectionSettings, CopilotClient):
 
     def create_mcs_client(self, connection_settings: ConnectionSettings) -> CopilotClient:
         token = connection_settings.acquire_token()
+        self.token_expires_on = get_token_expiry(token)
         return CopilotClient(connection_settings, token)
 
+    def token_expires_within(self, seconds: float) -> bool:
+        # The underlying CopilotClient keeps the token it was created with, so callers
+        # should build a new client once this returns True
+        return time.time() + seconds >= getattr(self, "token_expires_on", 0)
+
     async def start_conversation_async(self) -> list:
         acts = []
         # Attempt to connect to the copilot studio hosted agent here
@@ -1,10 +1,29 @@
 """Microsoft Copilot Studio Agent callback target implementation."""
 
+import asyncio
+import logging
 from typing import Optional, Dict, Any, Callable, List
 from dataclasses import dataclass
 from microsoft.agents.core.models import ActivityTypes
 from src.CopilotStudioClient import McsCopilotClient, McsConnectionSettings
 
+logger = logging.getLogger(__name__)
+
+_MESSAGE_ACTIVITY = ActivityTypes.message
+
+# Pooled clients are rebuilt when their access token has less than this many seconds left
+_TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+# Fallback responses; callers receive a copy so the templates are never mutated
+_EMPTY_RESPONSE = {
+    "content": "I cannot provide a response to this request.",
+    "role": "assistant"
+}
+_ERROR_RESPONSE = {
+    "content": "I encountered an error and couldn't process your request.",
+    "role": "assistant"
+}
+
 
 @dataclass
 class McsAgentConfig:
@@ -18,12 +37,43 @@ class McsAgentConfig:
 class McsAgentCallbackTarget:
     """A Microsoft Copilot Studio Agent callback target."""
     
-    def __init__(self, mcs_agent_config: McsAgentConfig):
-        """Initialize with MCS Agent configuration."""
+    def __init__(self, mcs_agent_config: McsAgentConfig, concurrency: int):
+        """Initialize with MCS Agent configuration and the maximum number of in-flight requests."""
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
         self.mcs_agent_config = mcs_agent_config
+        self.concurrency = concurrency
+        # Built once and shared by every client this target creates
+        self._connection_settings = McsConnectionSettings(
+            tenant_id=mcs_agent_config.tenant_id,
+            app_client_id=mcs_agent_config.app_client_id,
+            environment_id=mcs_agent_config.environment_id,
+            agent_identifier=mcs_agent_config.agent_identifier,
+        )
     
     def create_callback(self) -> Callable:
         """Create an async callback function that uses MCS Agent."""
+        # Clients are reused across probes so token acquisition happens once per
+        # client rather than once per prompt; a client is rebuilt when its token
+        # nears expiry. Empty slots are represented by None and filled on first
+        # use; the number of slots also bounds how many requests are in flight.
+        pool: "asyncio.Queue[Optional[McsCopilotClient]]" = asyncio.Queue()
+        for _ in range(self.concurrency):
+            pool.put_nowait(None)
+        
+        async def acquire_client() -> McsCopilotClient:
+            client = await pool.get()
+            try:
+                if client is None or client.token_expires_within(_TOKEN_REFRESH_MARGIN_SECONDS):
+                    client = McsCopilotClient(connection_settings=self._connection_settings)
+                
+                # Every probe gets a new conversation so earlier attack prompts
+                # never remain in the agent's context
+                await client.start_conversation_async()
+            except BaseException:
+                pool.put_nowait(None)
+                raise
+            return client
         
         async def mcs_agent_callback(
             messages: List,
@@ -34,56 +84,41 @@ class McsAgentCallbackTarget:
             """Async callback that uses Microsoft Copilot Studio Agent to generate responses."""
             
             # Extract the latest message from the conversation history
-            messages_list = [{"role": message.role, "content": message.content} for message in messages]
-            latest_message = messages_list[-1]["content"]
-            # print(f"Processing message: {latest_message}")
+            latest_message = messages[-1].content
             
             try:
-                # Create a connection settings object for the Copilot Studio client
-                connection_settings = McsConnectionSettings(
-                    tenant_id=self.mcs_agent_config.tenant_id,
-                    app_client_id=self.mcs_agent_config.app_client_id,
-                    environment_id=self.mcs_agent_config.environment_id,
-                    agent_identifier=self.mcs_agent_config.agent_identifier,
-                )
-                
-                # Initialize the Copilot Studio Client helper
-                client = McsCopilotClient(connection_settings=connection_settings)
-                
-                # Start a conversation with the Copilot Studio agent
-                await client.start_conversation_async()
+                # Take a client from the pool and start a fresh conversation
+                client = await acquire_client()
                 
                 # Ask a question to the Copilot Studio agent
-                activities = await client.ask_question_async(latest_message)
+                try:
+                    activities = await client.ask_question_async(latest_message)
+                except BaseException:
+                    # Drop the broken client so a fresh one takes its slot
+                    pool.put_nowait(None)
+                    raise
+                pool.put_nowait(client)
                 
                 # Extract content from response with validation
-                content = "".join(
-                    activity.text for activity in activities 
-                    if activity.type == ActivityTypes.message
-                )
-                
-                # Handle None or empty content
-                if content is None or content == "":
-                    content = "I cannot provide a response to this request."
-                    print("Warning: MCS Agent returned None or empty content, using default message")
+                content = "".join([
+                    activity.text for activity in activities
+                    if activity.type == _MESSAGE_ACTIVITY
+                ])
                 
-                # Format the response to follow the expected chat protocol format
-                formatted_response = {
-                    "content": content,
-                    "role": "assistant"
-                }
+                # Handle empty content
+                if not content:
+                    logger.warning("MCS Agent returned empty content, using default message")
+                    formatted_response = dict(_EMPTY_RESPONSE)
+                else:
+                    # Format the response to follow the expected chat protocol format
+                    formatted_response = {
+                        "content": content,
+                        "role": "assistant"
+                    }
                 
             except Exception as e:
-                print(f"Error calling Microsoft Copilot Studio Agent: {e!s}")
-                formatted_response = {
-                    "content": "I encountered an error and couldn't process your request.",
-                    "role": "assistant"
-                }
-            
-            # Ensure content is never None before returning
-            if formatted_response.get("content") is None:
-                formatted_response["content"] = "No response available."
-                print("Warning: Formatted response content was None, replaced with default")
+                logger.warning("Error calling Microsoft Copilot Studio Agent: %s", e)
+                formatted_response = dict(_ERROR_RESPONSE)
             
             return {"messages": [formatted_response]}
         